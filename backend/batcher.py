@@ -0,0 +1,90 @@
+"""
+Micro-batching of concurrent translation requests
+"""
+import asyncio
+from typing import Dict, List, Tuple
+
+from translator import TranslationService
+
+
+class TranslationBatcher:
+    """Groups concurrent requests per language pair into one batched translation"""
+    
+    def __init__(self, service: TranslationService, max_wait: float = 0.01, max_size: int = 16,
+                 timeout: float = 300.0):
+        self.service = service
+        self.max_wait = max_wait
+        self.max_size = max_size
+        self.timeout = timeout
+        self.queues: Dict[Tuple[str, str], asyncio.Queue] = {}
+        self.workers: Dict[Tuple[str, str], asyncio.Task] = {}
+    
+    async def translate(self, text: str, source_lang: str, target_lang: str) -> Dict[str, str]:
+        """Queue a text for translation and wait for its batch to complete"""
+        key = (source_lang, target_lang)
+        if key not in self.workers or self.workers[key].done():
+            # Separate queues keep each batch on a single model. A finished worker (crashed,
+            # or bound to an event loop that has since closed) is replaced with a fresh queue
+            self._fail_pending(key)
+            self.queues[key] = asyncio.Queue()
+            self.workers[key] = asyncio.create_task(self._worker(key, self.queues[key]))
+        
+        future = asyncio.get_running_loop().create_future()
+        await self.queues[key].put((text, future))
+        try:
+            return await asyncio.wait_for(future, timeout=self.timeout)
+        except asyncio.TimeoutError:
+            raise Exception(f"Translation timed out after {self.timeout:g}s")
+    
+    def _fail_pending(self, key: Tuple[str, str]):
+        """Fail requests still queued for a worker that is no longer running"""
+        queue = self.queues.get(key)
+        while queue is not None and not queue.empty():
+            _, future = queue.get_nowait()
+            try:
+                if not future.done():
+                    future.set_exception(Exception("Translation worker stopped"))
+            except RuntimeError:
+                # The future's event loop is already closed; nobody is waiting on it
+                pass
+    
+    async def _drain(self, queue: asyncio.Queue) -> List[Tuple[str, asyncio.Future]]:
+        """Wait for one item, then collect more until max_wait elapses or max_size is reached"""
+        batch = [await queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        
+        while len(batch) < self.max_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+            except asyncio.TimeoutError:
+                break
+        
+        return batch
+    
+    async def _worker(self, key: Tuple[str, str], queue: asyncio.Queue):
+        """Translate queued texts for one language pair, one batch at a time"""
+        source_lang, target_lang = key
+        while True:
+            batch = await self._drain(queue)
+            texts = [text for text, _ in batch]
+            
+            try:
+                result = await asyncio.to_thread(
+                    self.service.translate_batch, texts, source_lang, target_lang
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            for (_, future), translated_text in zip(batch, result["translated_texts"]):
+                if not future.done():
+                    future.set_result({
+                        "translated_text": translated_text,
+                        "model_used": result["model_used"]
+                    })
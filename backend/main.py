@@ -3,46 +3,72 @@ FastAPI backend for translation service
 """
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, Field
 from translator import TranslationService
+from batcher import TranslationBatcher
+import asyncio
+import orjson
 import os
-from typing import List, Optional
+import threading
+from typing import List, Literal, Optional, get_args
 
 app = FastAPI(
     title="Multi-Language Translation API",
     description="Translation service supporting Japanese, English, Hindi, Sinhala, and Mandarin",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # CORS configuration
-origins = os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
+origins = tuple(
+    origin.strip() for origin in os.getenv("CORS_ORIGINS", "http://localhost:3000").split(",")
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=origins,
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    # Explicit lists let preflights be answered without echoing request headers
+    allow_methods=["GET", "POST"],
+    allow_headers=["Content-Type", "Authorization"],
 )
 
 # Initialize translation service
 cache_dir = os.getenv("MODEL_CACHE_DIR", "./models")
-translation_service = TranslationService(cache_dir=cache_dir)
+inference_backend = os.getenv("INFERENCE_BACKEND", "ctranslate2")
+translation_service = TranslationService(
+    cache_dir=cache_dir,
+    backend=inference_backend,
+    cache_size=int(os.getenv("TRANSLATION_CACHE_SIZE", "4096")),
+    compile_models=os.getenv("TORCH_COMPILE", "false").lower() == "true",
+    quantize_int8=os.getenv("TORCH_QUANTIZE_INT8", "false").lower() == "true",
+    nllb_model_name=os.getenv("NLLB_MODEL"),
+    num_threads=int(os.getenv("TORCH_THREADS", "0")) or None
+)
 
-# Supported languages
-SUPPORTED_LANGUAGES = ['en', 'ja', 'zh', 'hi', 'si']
+# Concurrent requests for the same language pair share one generation call
+translation_batcher = TranslationBatcher(
+    translation_service,
+    max_wait=float(os.getenv("BATCH_MAX_WAIT_MS", "10")) / 1000,
+    max_size=int(os.getenv("BATCH_MAX_SIZE", "16")),
+    timeout=float(os.getenv("BATCH_TIMEOUT_S", "300"))
+)
+
+# Supported languages (validated by Pydantic, so bad codes get a 422 before the handler runs)
+LanguageCode = Literal['en', 'ja', 'zh', 'hi', 'si']
 
 
 class TranslationRequest(BaseModel):
     """Request model for translation"""
     text: str = Field(..., description="Text to translate", min_length=1, max_length=5000)
-    source_lang: str = Field(..., description="Source language code (en, ja, zh, hi, si)")
-    target_lang: str = Field(..., description="Target language code (en, ja, zh, hi, si)")
+    source_lang: LanguageCode = Field(..., description="Source language code (en, ja, zh, hi, si)")
+    target_lang: LanguageCode = Field(..., description="Target language code (en, ja, zh, hi, si)")
 
 class ParagraphsTranslationRequest(BaseModel):
     """Request model for paragraph translation"""
     paragraphs: List[str] = Field(..., description="Paragraphs to translate")
-    source_lang: str = Field(..., description="Source language code (en, ja, zh, hi, si)")
-    target_lang: str = Field(..., description="Target language code (en, ja, zh, hi, si)")
+    source_lang: LanguageCode = Field(..., description="Source language code (en, ja, zh, hi, si)")
+    target_lang: LanguageCode = Field(..., description="Target language code (en, ja, zh, hi, si)")
 
 
 class TranslationResponse(BaseModel):
@@ -66,9 +92,11 @@ async def startup_event():
     """Preload models on startup"""
     print("Starting translation service...")
     print("Preloading models (this may take a few minutes)...")
-    # Preload common models in background
-    # For production, you might want to do this asynchronously
-    # translation_service.preload_models()
+    # Preload common models and run dummy translations per pair so that model
+    # loading, CUDA kernel selection and compilation don't land on the first real request
+    if os.getenv("PRELOAD_MODELS", "false").lower() == "true":
+        translation_service.preload_models()
+        translation_service.warmup()
     print("Service ready!")
 
 
@@ -78,9 +106,10 @@ async def root():
     return {
         "message": "Multi-Language Translation API",
         "version": "1.0.0",
-        "supported_languages": SUPPORTED_LANGUAGES,
+        "supported_languages": list(get_args(LanguageCode)),
         "endpoints": {
             "translate": "/translate",
+            "translate_stream": "/translate/stream",
             "health": "/health",
             "languages": "/languages"
         }
@@ -93,6 +122,7 @@ async def health_check():
     return {
         "status": "healthy",
         "device": translation_service.device,
+        "backend": translation_service.backend,
         "loaded_models": list(translation_service.models.keys())
     }
 
@@ -116,26 +146,13 @@ async def translate(request: TranslationRequest):
     """
     Translate text from source language to target language
     """
-    # Validate language codes
-    if request.source_lang not in SUPPORTED_LANGUAGES:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Unsupported source language: {request.source_lang}. Supported: {SUPPORTED_LANGUAGES}"
-        )
-    
-    if request.target_lang not in SUPPORTED_LANGUAGES:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Unsupported target language: {request.target_lang}. Supported: {SUPPORTED_LANGUAGES}"
-        )
-    
     # Validate text
     if not request.text.strip():
         raise HTTPException(status_code=400, detail="Text cannot be empty")
     
     try:
         # Perform translation
-        result = translation_service.translate(
+        result = await translation_batcher.translate(
             text=request.text,
             source_lang=request.source_lang,
             target_lang=request.target_lang
@@ -156,41 +173,66 @@ async def translate(request: TranslationRequest):
         )
 
 
+@app.post("/translate/stream")
+async def translate_stream(request: TranslationRequest):
+    """
+    Stream a translation as Server-Sent Events while it is being generated
+    """
+    # Validate text
+    if not request.text.strip():
+        raise HTTPException(status_code=400, detail="Text cannot be empty")
+    
+    # Set once the response ends for any reason, so an abandoned stream stops decoding
+    cancel = threading.Event()
+    
+    def event_stream():
+        # Runs in Starlette's threadpool; each chunk is JSON so newlines can't break SSE framing
+        try:
+            for chunk in translation_service.translate_stream(
+                text=request.text,
+                source_lang=request.source_lang,
+                target_lang=request.target_lang,
+                cancel=cancel
+            ):
+                yield f"data: {orjson.dumps({'text': chunk}).decode()}\n\n"
+            yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            print(f"Streaming translation error: {str(e)}")
+            yield f"event: error\ndata: {orjson.dumps({'detail': str(e)}).decode()}\n\n"
+        finally:
+            cancel.set()
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @app.post("/translate/paragraphs", response_model=ParagraphsTranslationResponse)
 async def translate_paragraphs(request: ParagraphsTranslationRequest):
     """
     Translate a list of paragraphs from source language to target language
     """
-    # Validate language codes
-    if request.source_lang not in SUPPORTED_LANGUAGES:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Unsupported source language: {request.source_lang}. Supported: {SUPPORTED_LANGUAGES}"
-        )
-
-    if request.target_lang not in SUPPORTED_LANGUAGES:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Unsupported target language: {request.target_lang}. Supported: {SUPPORTED_LANGUAGES}"
-        )
-
     if not request.paragraphs or not any(paragraph.strip() for paragraph in request.paragraphs):
         raise HTTPException(status_code=400, detail="Paragraphs cannot be empty")
 
-    translated_paragraphs: List[str] = []
-    model_used: Optional[str] = None
-
     try:
+        results = await asyncio.gather(*[
+            translation_batcher.translate(
+                text=paragraph,
+                source_lang=request.source_lang,
+                target_lang=request.target_lang
+            )
+            for paragraph in request.paragraphs
+            if paragraph and paragraph.strip()
+        ])
+        translated = iter(results)
+
+        translated_paragraphs: List[str] = []
+        model_used: Optional[str] = None
         for paragraph in request.paragraphs:
             if not paragraph or not paragraph.strip():
                 translated_paragraphs.append("")
                 continue
 
-            result = translation_service.translate(
-                text=paragraph,
-                source_lang=request.source_lang,
-                target_lang=request.target_lang
-            )
+            result = next(translated)
             translated_paragraphs.append(result["translated_text"])
             model_used = result["model_used"]
 
@@ -214,11 +256,14 @@ if __name__ == "__main__":
     port = int(os.getenv("PORT", 8000))
     host = os.getenv("HOST", "0.0.0.0")
     reload_enabled = os.getenv("RELOAD", "false").lower() == "true"
+    # Each worker loads its own models; size WORKERS x TORCH_THREADS to the physical cores
+    workers = int(os.getenv("WORKERS", "1"))
     
     uvicorn.run(
         "main:app",
         host=host,
         port=port,
         reload=reload_enabled,
+        workers=workers,
         log_level="info"
     )
@@ -1,25 +1,154 @@
 """
 Translation service using MarianMT and NLLB models
 """
-from transformers import MarianMTModel, MarianTokenizer, AutoModelForSeq2SeqLM, AutoTokenizer
+from transformers import (
+    MarianMTModel, MarianTokenizer, AutoModelForSeq2SeqLM, AutoTokenizer, BitsAndBytesConfig,
+    StoppingCriteria, StoppingCriteriaList, TextStreamer
+)
+from huggingface_hub import snapshot_download
 import torch
-from typing import Dict, Tuple, Optional
+from typing import Callable, Dict, Iterator, List, Tuple, Optional
+from collections import OrderedDict
+import glob
 import os
+import queue
+import shutil
+import tempfile
+import threading
+
+try:
+    import ctranslate2
+except ImportError:
+    ctranslate2 = None
+
+try:
+    import onnxruntime
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+except ImportError:
+    ORTModelForSeq2SeqLM = None
+
+# Upper-bound (roughly p95) output/input token-length ratios per language pair. These are
+# caps on decoding, not averages: a mean-based cap would truncate about half of outputs.
+# Only pairs with measured averages (ja-en ~1.3x, zh-en ~1.1x) are listed, each tighter
+# than the 2x cap that all other pairs keep.
+LENGTH_RATIOS = {
+    'ja-en': 1.8,
+    'zh-en': 1.6,
+}
+
+
+def _cpu_supports_bf16() -> bool:
+    """Whether the CPU has native bf16 instructions (AVX-512_BF16 or AMX) usable by oneDNN"""
+    if not torch.backends.mkldnn.is_available():
+        return False
+    try:
+        # Private op, only registered on MKLDNN builds
+        if not torch.ops.mkldnn._is_mkldnn_bf16_supported():
+            return False
+    except (AttributeError, RuntimeError):
+        return False
+    
+    # oneDNN also "supports" bf16 on plain AVX-512 by emulation, which is slower than fp32
+    try:
+        with open("/proc/cpuinfo") as f:
+            flags = f.read()
+    except OSError:
+        return False
+    return "avx512_bf16" in flags or "amx_bf16" in flags
+
+
+def _build_dir_atomically(target_dir: str, build: Callable[[str], None]):
+    """Run build() into a temp directory next to target_dir, then rename it into place.
+    
+    An interrupted build never leaves a partial target_dir behind, and when several
+    workers build the same directory concurrently the first complete one wins.
+    """
+    parent = os.path.dirname(target_dir)
+    os.makedirs(parent, exist_ok=True)
+    tmp_dir = tempfile.mkdtemp(dir=parent, prefix=f"{os.path.basename(target_dir)}.tmp-")
+    try:
+        build(tmp_dir)
+        try:
+            os.replace(tmp_dir, target_dir)
+        except OSError:
+            if not os.path.isdir(target_dir):
+                raise
+            # Another worker finished first; keep its copy
+    finally:
+        if os.path.isdir(tmp_dir):
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+class _CallbackStreamer(TextStreamer):
+    """Streamer that hands each finalized piece of text to a callback instead of printing it"""
+    
+    def __init__(self, tokenizer, callback: Callable[[str], None], **decode_kwargs):
+        super().__init__(tokenizer, skip_prompt=True, **decode_kwargs)
+        self.callback = callback
+    
+    def on_finalized_text(self, text: str, stream_end: bool = False):
+        if text:
+            self.callback(text)
+
+
+class _CancelCriteria(StoppingCriteria):
+    """Stops generate() once the cancel event is set (e.g. the streaming client went away)"""
+    
+    def __init__(self, cancel: threading.Event):
+        self.cancel = cancel
+    
+    def __call__(self, input_ids, scores, **kwargs) -> bool:
+        return self.cancel.is_set()
+
 
 class TranslationService:
     """Manages translation models and performs translations"""
     
-    def __init__(self, cache_dir: Optional[str] = None):
+    def __init__(self, cache_dir: Optional[str] = None, backend: str = "ctranslate2",
+                 cache_size: int = 4096, compile_models: bool = False,
+                 quantize_int8: bool = False, nllb_model_name: Optional[str] = None,
+                 num_threads: Optional[int] = None):
         self.cache_dir = cache_dir or "./models"
         self.models: Dict[str, Tuple] = {}
+        self._lock = threading.Lock()
+        
+        # LRU cache of finished translations keyed on (source_lang, target_lang, text)
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, str, str], Tuple[str, str]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         print(f"Using device: {self.device}")
         
+        # Intra-op threads per process; keep threads x workers <= physical cores
+        self.num_threads = num_threads or min(4, os.cpu_count() or 1)
+        if self.device == "cpu":
+            self._configure_cpu_threads()
+        
+        # Inference backend: CTranslate2 (int8), ONNX Runtime or PyTorch as fallback
+        if backend == "ctranslate2" and ctranslate2 is None:
+            print("ctranslate2 is not installed, falling back to PyTorch backend")
+            backend = "torch"
+        if backend == "onnxruntime" and ORTModelForSeq2SeqLM is None:
+            print("optimum[onnxruntime] is not installed, falling back to PyTorch backend")
+            backend = "torch"
+        self.backend = backend
+        print(f"Using backend: {self.backend}")
+        
+        # torch.compile the PyTorch backend's forward pass (slow first calls, faster decode)
+        self.compile_models = compile_models and backend == "torch"
+        
+        # int8 weights for the PyTorch backend (bitsandbytes on GPU, dynamic quantization on CPU)
+        self.quantize_int8 = quantize_int8 and backend == "torch"
+        if self.compile_models and self.quantize_int8:
+            raise ValueError("TORCH_COMPILE cannot be combined with TORCH_QUANTIZE_INT8")
+        
         # Model mappings for MarianMT
         self.marian_models = {}
         
         # NLLB model for Sinhala and fallback
-        self.nllb_model_name = 'facebook/nllb-200-1.3B'
+        self.nllb_model_name = nllb_model_name or 'facebook/nllb-200-distilled-600M'
         
         # NLLB language codes mapping
         self.nllb_lang_codes = {
@@ -30,31 +159,198 @@ class TranslationService:
             'si': 'sin_Sinh',
         }
         
+    def _configure_cpu_threads(self):
+        """Pin PyTorch thread pools and enable oneDNN kernels for CPU inference"""
+        torch.set_num_threads(self.num_threads)
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # Can only be set once per process, before any inter-op work has started
+            pass
+        print(f"Using {self.num_threads} CPU threads")
+        
+        torch.backends.mkldnn.enabled = True
+        if "onednn" in torch.backends.quantized.supported_engines:
+            torch.backends.quantized.engine = "onednn"
+    
+    def _torch_dtype(self) -> torch.dtype:
+        """Pick the weight dtype for PyTorch models: fp16 on GPU, bf16 on CPUs with AVX-512_BF16"""
+        if self.device == "cuda":
+            return torch.float16
+        
+        if _cpu_supports_bf16():
+            return torch.bfloat16
+        return torch.float32
+    
+    def _load_ct2_model(self, model_name: str):
+        """Load a CTranslate2 int8 model, converting the checkpoint on first use"""
+        output_dir = os.path.join(self.cache_dir, "ct2", model_name.replace("/", "--"))
+        if not os.path.isdir(output_dir):
+            print(f"Converting {model_name} to CTranslate2 format: {output_dir}")
+            # Download into MODEL_CACHE_DIR so the weights live on the mounted models volume
+            # Only what TransformersConverter reads: skip TF/Flax/Rust weights in the repo
+            model_path = snapshot_download(
+                model_name,
+                cache_dir=self.cache_dir,
+                allow_patterns=["*.json", "*.bin", "*.safetensors", "*.model", "*.spm", "*.txt"]
+            )
+            converter = ctranslate2.converters.TransformersConverter(model_path)
+            _build_dir_atomically(
+                output_dir,
+                lambda tmp_dir: converter.convert(tmp_dir, quantization="int8", force=True)
+            )
+        
+        compute_type = "int8_float16" if self.device == "cuda" else "int8"
+        return ctranslate2.Translator(
+            output_dir,
+            device=self.device,
+            compute_type=compute_type,
+            intra_threads=self.num_threads
+        )
+    
+    def _compile_model(self, model):
+        """Compile the model's forward pass; generate() keeps its Python loop"""
+        model.eval()
+        if not self.compile_models:
+            return model
+        
+        # No CUDA graphs ("reduce-overhead"): the KV cache grows every decode step, so each
+        # length and batch/beam shape would record its own graph and memory pool
+        model.forward = torch.compile(model.forward, mode="default", dynamic=True)
+        return model
+    
+    def _load_ort_model(self, model_name: str):
+        """Load an ONNX Runtime model, exporting (and int8-quantizing on CPU) on first use"""
+        export_dir = os.path.join(self.cache_dir, "onnx", model_name.replace("/", "--"))
+        if not os.path.isdir(export_dir):
+            print(f"Exporting {model_name} to ONNX: {export_dir}")
+            
+            def export(tmp_dir: str):
+                ort_model = ORTModelForSeq2SeqLM.from_pretrained(
+                    model_name,
+                    cache_dir=self.cache_dir,
+                    export=True
+                )
+                ort_model.save_pretrained(tmp_dir)
+            
+            _build_dir_atomically(export_dir, export)
+        
+        if self.device == "cuda":
+            # Dynamic int8 ops run on CPU only, so GPU serves the exported graph as-is
+            return ORTModelForSeq2SeqLM.from_pretrained(export_dir, provider="CUDAExecutionProvider")
+        
+        session_options = onnxruntime.SessionOptions()
+        session_options.intra_op_num_threads = self.num_threads
+        session_options.inter_op_num_threads = 1
+        
+        quantized_dir = f"{export_dir}-int8"
+        if not os.path.isdir(quantized_dir):
+            print(f"Quantizing {model_name} to int8: {quantized_dir}")
+            
+            def quantize(tmp_dir: str):
+                quantization_config = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=True)
+                for onnx_file in glob.glob(os.path.join(export_dir, "*.onnx")):
+                    quantizer = ORTQuantizer.from_pretrained(export_dir, file_name=os.path.basename(onnx_file))
+                    quantizer.quantize(save_dir=tmp_dir, quantization_config=quantization_config)
+            
+            # Every component must be quantized before the directory is considered usable
+            _build_dir_atomically(quantized_dir, quantize)
+        
+        return ORTModelForSeq2SeqLM.from_pretrained(
+            quantized_dir,
+            encoder_file_name="encoder_model_quantized.onnx",
+            decoder_file_name="decoder_model_quantized.onnx",
+            decoder_with_past_file_name="decoder_with_past_model_quantized.onnx",
+            provider="CPUExecutionProvider",
+            session_options=session_options
+        )
+    
+    def _load_converted_model(self, model_class, model_name: str, dtype: torch.dtype):
+        """Load a model from a safetensors copy already in the target dtype, creating it on first use"""
+        dtype_name = str(dtype).replace("torch.", "")
+        local_dir = os.path.join(self.cache_dir, "torch", f"{model_name.replace('/', '--')}-{dtype_name}")
+        
+        if os.path.isdir(local_dir):
+            # safetensors are memory-mapped, and on GPU tensors are copied straight to the device
+            device_map = {"": 0} if self.device == "cuda" else None
+            model = model_class.from_pretrained(local_dir, torch_dtype=dtype, device_map=device_map)
+            return model.to(self.device)
+        
+        model = model_class.from_pretrained(
+            model_name,
+            cache_dir=self.cache_dir,
+            torch_dtype=dtype
+        )
+        print(f"Saving {dtype_name} copy of {model_name}: {local_dir}")
+        # A partial copy must never be picked up by the isdir() check above
+        _build_dir_atomically(
+            local_dir,
+            lambda tmp_dir: model.save_pretrained(tmp_dir, safe_serialization=True)
+        )
+        return model.to(self.device)
+    
+    def _load_torch_model(self, model_class, model_name: str):
+        """Load a PyTorch model with the configured dtype, int8 quantization and compilation"""
+        if self.quantize_int8 and self.device == "cuda":
+            # bitsandbytes LLM.int8: weights are placed on the GPU at load time
+            model = model_class.from_pretrained(
+                model_name,
+                cache_dir=self.cache_dir,
+                torch_dtype=torch.float16,
+                quantization_config=BitsAndBytesConfig(load_in_8bit=True, llm_int8_threshold=6.0),
+                device_map={"": 0}
+            )
+        elif self.quantize_int8:
+            # Dynamic W8A8 Linear layers (fbgemm/oneDNN VNNI kernels) need fp32 weights
+            model = model_class.from_pretrained(
+                model_name,
+                cache_dir=self.cache_dir,
+                torch_dtype=torch.float32
+            )
+            model = torch.ao.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        else:
+            model = self._load_converted_model(model_class, model_name, self._torch_dtype())
+        return self._compile_model(model)
+    
     def _load_marian_model(self, model_name: str) -> Tuple:
         """Load a MarianMT model and tokenizer"""
         print(f"Loading MarianMT model: {model_name}")
-        tokenizer = MarianTokenizer.from_pretrained(
-            model_name, 
-            cache_dir=self.cache_dir
-        )
-        model = MarianMTModel.from_pretrained(
-            model_name,
-            cache_dir=self.cache_dir
-        ).to(self.device)
-        return model, tokenizer
+        try:
+            # Rust-backed tokenizer when the installed transformers provides one for Marian
+            tokenizer = AutoTokenizer.from_pretrained(
+                model_name,
+                cache_dir=self.cache_dir,
+                use_fast=True
+            )
+        except (ValueError, OSError) as e:
+            print(f"Fast tokenizer unavailable for {model_name}, using MarianTokenizer: {str(e)}")
+            tokenizer = MarianTokenizer.from_pretrained(
+                model_name,
+                cache_dir=self.cache_dir
+            )
+        if self.backend == "ctranslate2":
+            return self._load_ct2_model(model_name), tokenizer
+        if self.backend == "onnxruntime":
+            return self._load_ort_model(model_name), tokenizer
+        
+        return self._load_torch_model(MarianMTModel, model_name), tokenizer
     
     def _load_nllb_model(self) -> Tuple:
         """Load NLLB model and tokenizer"""
         print(f"Loading NLLB model: {self.nllb_model_name}")
         tokenizer = AutoTokenizer.from_pretrained(
             self.nllb_model_name,
-            cache_dir=self.cache_dir
+            cache_dir=self.cache_dir,
+            use_fast=True
         )
-        model = AutoModelForSeq2SeqLM.from_pretrained(
-            self.nllb_model_name,
-            cache_dir=self.cache_dir
-        ).to(self.device)
-        return model, tokenizer
+        if self.backend == "ctranslate2":
+            return self._load_ct2_model(self.nllb_model_name), tokenizer
+        if self.backend == "onnxruntime":
+            return self._load_ort_model(self.nllb_model_name), tokenizer
+        
+        return self._load_torch_model(AutoModelForSeq2SeqLM, self.nllb_model_name), tokenizer
     
     def _get_model(self, lang_pair: str) -> Tuple[str, Tuple]:
         """Get the appropriate model for a language pair"""
@@ -70,6 +366,198 @@ class TranslationService:
             self.models['nllb'] = self._load_nllb_model()
         return 'nllb', self.models['nllb']
     
+    def _cache_get(self, key: Tuple[str, str, str]) -> Optional[Tuple[str, str]]:
+        """Return a cached (translated_text, model_used) pair and mark it recently used"""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+            return entry
+    
+    def _cache_put(self, key: Tuple[str, str, str], entry: Tuple[str, str]):
+        """Store a translation, evicting the least recently used entry when full"""
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = entry
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+    
+    def _max_new_tokens(self, source_lang: str, target_lang: str, input_length: int) -> int:
+        """Cap decoder steps from the input length and the pair's upper-bound length ratio"""
+        # Unlisted pairs get exactly the original min(256, max(32, 2 * input_length)) cap
+        ratio = LENGTH_RATIOS.get(f"{source_lang}-{target_lang}", 2.0)
+        return min(256, max(32, int(input_length * ratio)))
+    
+    def _num_beams(self, input_length: int) -> int:
+        """Use greedy decoding for short inputs and widen the beam as inputs grow"""
+        if input_length <= 16:
+            return 1
+        if input_length <= 64:
+            return 2
+        return 5
+    
+    def _ct2_inputs(self, tokenizer, model_type: str, texts: List[str],
+                    source_lang: str, target_lang: str) -> Tuple:
+        """Tokenize texts for CTranslate2 and build the decoding settings shared by all calls"""
+        source_tokens = [
+            tokenizer.convert_ids_to_tokens(tokenizer.encode(text, truncation=True, max_length=512))
+            for text in texts
+        ]
+        input_length = max(len(tokens) for tokens in source_tokens)
+        
+        # NLLB selects the output language through the first decoder token
+        target_prefix = None
+        if model_type == 'nllb':
+            target_prefix = [[self.nllb_lang_codes[target_lang]]] * len(texts)
+        
+        decode_kwargs = {
+            "max_decoding_length": self._max_new_tokens(source_lang, target_lang, input_length),
+            "no_repeat_ngram_size": 3,
+            "repetition_penalty": 1.2,
+        }
+        return source_tokens, target_prefix, input_length, decode_kwargs
+    
+    def _generate_ct2(self, translator, tokenizer, model_type: str, texts: List[str],
+                      source_lang: str, target_lang: str) -> List[str]:
+        """Decode a batch of texts through a CTranslate2 translator"""
+        source_tokens, target_prefix, input_length, decode_kwargs = self._ct2_inputs(
+            tokenizer, model_type, texts, source_lang, target_lang
+        )
+        
+        results = translator.translate_batch(
+            source_tokens,
+            target_prefix=target_prefix,
+            beam_size=self._num_beams(input_length),
+            **decode_kwargs,
+        )
+        
+        output_ids = [tokenizer.convert_tokens_to_ids(result.hypotheses[0]) for result in results]
+        return tokenizer.batch_decode(
+            output_ids, skip_special_tokens=True, clean_up_tokenization_spaces=False
+        )
+    
+    def _stream_ct2(self, translator, tokenizer, model_type: str, text: str,
+                    source_lang: str, target_lang: str, emit: Callable[[str], None],
+                    cancel: threading.Event):
+        """Greedily decode one text through CTranslate2, emitting text as tokens arrive"""
+        source_tokens, target_prefix, _, decode_kwargs = self._ct2_inputs(
+            tokenizer, model_type, [text], source_lang, target_lang
+        )
+        
+        output_ids: List[int] = []
+        emitted = ""
+        for step in translator.generate_tokens(
+            source_tokens[0],
+            target_prefix=target_prefix[0] if target_prefix else None,
+            **decode_kwargs,
+        ):
+            if cancel.is_set():
+                break
+            output_ids.append(step.token_id)
+            # Re-decode the whole prefix: sentencepiece pieces only become text in context
+            decoded = tokenizer.decode(
+                output_ids, skip_special_tokens=True, clean_up_tokenization_spaces=False
+            )
+            if len(decoded) > len(emitted) and not decoded.endswith("\ufffd"):
+                emit(decoded[len(emitted):])
+                emitted = decoded
+    
+    def _torch_inputs(self, tokenizer, model_type: str, texts: List[str],
+                      source_lang: str, target_lang: str) -> Tuple:
+        """Tokenize texts onto the device and build the generate() kwargs shared by all calls"""
+        # Tensor cores want sequence lengths padded to a multiple of 8; on CPU it is wasted work
+        pad_to_multiple_of = 8 if self.device == "cuda" else None
+        inputs = tokenizer(
+            texts,
+            return_tensors="pt",
+            padding=True,
+            truncation=True,
+            max_length=512,
+            pad_to_multiple_of=pad_to_multiple_of
+        ).to(self.device)
+        input_length = int(inputs["attention_mask"].sum(dim=1).max())
+        
+        generate_kwargs = {
+            "max_new_tokens": self._max_new_tokens(source_lang, target_lang, input_length),
+            "no_repeat_ngram_size": 3,
+            "repetition_penalty": 1.2,
+            # Reuse decoder key/values across steps regardless of model config
+            "use_cache": True,
+            "return_dict_in_generate": False,
+        }
+        if model_type == 'nllb':
+            # Generate translation with target language
+            generate_kwargs["forced_bos_token_id"] = tokenizer.convert_tokens_to_ids(
+                self.nllb_lang_codes[target_lang]
+            )
+        return inputs, input_length, generate_kwargs
+    
+    @torch.inference_mode()
+    def _generate_torch(self, model, tokenizer, model_type: str, texts: List[str],
+                        source_lang: str, target_lang: str) -> List[str]:
+        """Decode a padded batch of texts through a PyTorch model's generate()"""
+        inputs, input_length, generate_kwargs = self._torch_inputs(
+            tokenizer, model_type, texts, source_lang, target_lang
+        )
+        
+        num_beams = self._num_beams(input_length)
+        if num_beams > 1:
+            generate_kwargs["early_stopping"] = True
+        
+        translated = model.generate(**inputs, **generate_kwargs, num_beams=num_beams)
+        
+        # The English-oriented space cleanup only costs time for ja/zh/hi/si output
+        return tokenizer.batch_decode(
+            translated, skip_special_tokens=True, clean_up_tokenization_spaces=False
+        )
+    
+    @torch.inference_mode()
+    def _stream_torch(self, model, tokenizer, model_type: str, text: str,
+                      source_lang: str, target_lang: str, emit: Callable[[str], None],
+                      cancel: threading.Event):
+        """Greedily decode one text through generate(), emitting text as tokens arrive"""
+        inputs, _, generate_kwargs = self._torch_inputs(
+            tokenizer, model_type, [text], source_lang, target_lang
+        )
+        
+        # HF streamers only support greedy decoding
+        streamer = _CallbackStreamer(
+            tokenizer, emit, skip_special_tokens=True, clean_up_tokenization_spaces=False
+        )
+        model.generate(
+            **inputs,
+            **generate_kwargs,
+            num_beams=1,
+            streamer=streamer,
+            stopping_criteria=StoppingCriteriaList([_CancelCriteria(cancel)])
+        )
+    
+    def _generate(self, lang_pair: str, source_lang: str, target_lang: str,
+                  texts: List[str]) -> Tuple[str, List[str]]:
+        """Run one batched generation call and return the model type and outputs"""
+        # Tokenizer state (NLLB src_lang) and lazy model loading are shared
+        # between language pairs, so generation runs one batch at a time
+        with self._lock:
+            model_type, (model, tokenizer) = self._get_model(lang_pair)
+            
+            if model_type == 'nllb':
+                # Set source language code for the NLLB tokenizer
+                tokenizer.src_lang = self.nllb_lang_codes[source_lang]
+            
+            if self.backend == "ctranslate2":
+                outputs = self._generate_ct2(
+                    model, tokenizer, model_type, texts, source_lang, target_lang
+                )
+            else:
+                # ONNX Runtime models expose the same generate() API
+                outputs = self._generate_torch(
+                    model, tokenizer, model_type, texts, source_lang, target_lang
+                )
+        
+        return model_type, outputs
+    
     def translate(self, text: str, source_lang: str, target_lang: str) -> Dict[str, str]:
         """
         Translate text from source language to target language
@@ -88,66 +576,67 @@ class TranslationService:
                 "model_used": "none"
             }
         
+        result = self.translate_batch([text], source_lang, target_lang)
+        return {
+            "translated_text": result["translated_texts"][0],
+            "model_used": result["model_used"]
+        }
+    
+    def translate_batch(self, texts: List[str], source_lang: str, target_lang: str) -> Dict:
+        """
+        Translate several texts for one language pair in a single generation call
+        
+        Args:
+            texts: Texts to translate
+            source_lang: Source language code (en, ja, zh, hi, si)
+            target_lang: Target language code
+            
+        Returns:
+            Dictionary with translated_texts (in input order) and model_used
+        """
         # Prevent translating to same language
         if source_lang == target_lang:
             return {
-                "translated_text": text,
+                "translated_texts": list(texts),
                 "model_used": "pass-through"
             }
         
+        translated_texts = [""] * len(texts)
+        model_used = "none"
+        pending = []
+        for i, text in enumerate(texts):
+            if not text or not text.strip():
+                continue
+            cached = self._cache_get((source_lang, target_lang, text))
+            if cached is None:
+                pending.append(i)
+            else:
+                translated_texts[i], model_used = cached
+        
+        if not pending:
+            return {
+                "translated_texts": translated_texts,
+                "model_used": model_used
+            }
+        
         lang_pair = f"{source_lang}-{target_lang}"
         
         try:
-            model_type, (model, tokenizer) = self._get_model(lang_pair)
+            model_type, outputs = self._generate(
+                lang_pair, source_lang, target_lang, [texts[i] for i in pending]
+            )
             
             if model_type == 'marian':
-                # MarianMT translation
-                inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=512)
-                inputs = {k: v.to(self.device) for k, v in inputs.items()}
-                input_length = int(inputs["input_ids"].shape[1])
-                max_new_tokens = min(256, max(32, input_length * 2))
-                
-                with torch.no_grad():
-                    translated = model.generate(
-                        **inputs,
-                        max_new_tokens=max_new_tokens,
-                        num_beams=5,
-                        early_stopping=True,
-                        no_repeat_ngram_size=3,
-                        repetition_penalty=1.2,
-                    )
-                
-                translated_text = tokenizer.decode(translated[0], skip_special_tokens=True)
                 model_used = f"MarianMT ({lang_pair})"
-                
-            else:  # NLLB
-                # Set source and target language codes
-                tokenizer.src_lang = self.nllb_lang_codes[source_lang]
-                
-                inputs = tokenizer(text, return_tensors="pt", padding=True, truncation=True, max_length=512)
-                inputs = {k: v.to(self.device) for k, v in inputs.items()}
-                input_length = int(inputs["input_ids"].shape[1])
-                max_new_tokens = min(256, max(32, input_length * 2))
-                
-                # Generate translation with target language
-                forced_bos_token_id = tokenizer.convert_tokens_to_ids(self.nllb_lang_codes[target_lang])
-                
-                with torch.no_grad():
-                    translated = model.generate(
-                        **inputs,
-                        forced_bos_token_id=forced_bos_token_id,
-                        max_new_tokens=max_new_tokens,
-                        num_beams=5,
-                        early_stopping=True,
-                        no_repeat_ngram_size=3,
-                        repetition_penalty=1.2,
-                    )
-                
-                translated_text = tokenizer.decode(translated[0], skip_special_tokens=True)
+            else:
                 model_used = f"NLLB-200 ({lang_pair})"
             
+            for i, output in zip(pending, outputs):
+                translated_texts[i] = output
+                self._cache_put((source_lang, target_lang, texts[i]), (output, model_used))
+            
             return {
-                "translated_text": translated_text,
+                "translated_texts": translated_texts,
                 "model_used": model_used
             }
             
@@ -155,6 +644,87 @@ class TranslationService:
             print(f"Translation error: {str(e)}")
             raise Exception(f"Translation failed: {str(e)}")
     
+    def translate_stream(self, text: str, source_lang: str, target_lang: str,
+                         cancel: Optional[threading.Event] = None) -> Iterator[str]:
+        """
+        Translate text and yield the output incrementally as it is generated
+        
+        Streaming uses greedy decoding, so output can differ slightly from translate().
+        
+        Args:
+            text: Text to translate
+            source_lang: Source language code (en, ja, zh, hi, si)
+            target_lang: Target language code
+            cancel: Event that stops generation early, e.g. when the client disconnects
+            
+        Yields:
+            Consecutive chunks of the translated text
+        """
+        if not text or not text.strip():
+            return
+        
+        # Prevent translating to same language
+        if source_lang == target_lang:
+            yield text
+            return
+        
+        cached = self._cache_get((source_lang, target_lang, text))
+        if cached is not None:
+            yield cached[0]
+            return
+        
+        # Generation runs on its own thread so chunks reach the client as they are produced
+        cancel = cancel or threading.Event()
+        chunks: "queue.Queue" = queue.Queue()
+        worker = threading.Thread(
+            target=self._stream_worker,
+            args=(source_lang, target_lang, text, chunks, cancel),
+            daemon=True
+        )
+        worker.start()
+        
+        try:
+            while True:
+                chunk = chunks.get()
+                if chunk is None:
+                    break
+                if isinstance(chunk, Exception):
+                    raise Exception(f"Translation failed: {str(chunk)}")
+                yield chunk
+        finally:
+            # Consumer stopped early (closed generator or error): release the model lock
+            cancel.set()
+    
+    def _stream_worker(self, source_lang: str, target_lang: str, text: str, chunks: "queue.Queue",
+                       cancel: threading.Event):
+        """Run streaming generation for one text, pushing chunks and a final None onto the queue"""
+        lang_pair = f"{source_lang}-{target_lang}"
+        try:
+            with self._lock:
+                if cancel.is_set():
+                    # Client left while waiting for the lock
+                    return
+                
+                model_type, (model, tokenizer) = self._get_model(lang_pair)
+                
+                if model_type == 'nllb':
+                    # Set source language code for the NLLB tokenizer
+                    tokenizer.src_lang = self.nllb_lang_codes[source_lang]
+                
+                if self.backend == "ctranslate2":
+                    self._stream_ct2(
+                        model, tokenizer, model_type, text, source_lang, target_lang, chunks.put, cancel
+                    )
+                else:
+                    self._stream_torch(
+                        model, tokenizer, model_type, text, source_lang, target_lang, chunks.put, cancel
+                    )
+        except Exception as e:
+            print(f"Translation error: {str(e)}")
+            chunks.put(e)
+        finally:
+            chunks.put(None)
+    
     def preload_models(self, lang_pairs: list = None):
         """Preload models to speed up first requests"""
         if lang_pairs is None:
@@ -174,3 +744,29 @@ class TranslationService:
             self._get_model('en-si')  # This will load NLLB
         except Exception as e:
             print(f"Failed to preload NLLB: {str(e)}")
+    
+    def warmup(self, lang_pairs: list = None):
+        """Run dummy translations per language pair so kernel selection and compilation
+        happen before real traffic"""
+        if lang_pairs is None:
+            lang_pairs = ['en-ja', 'ja-en', 'en-zh', 'zh-en', 'en-si']
+        
+        # One greedy-length and one beam-search-length input, so both decode paths are warm
+        warmup_texts = [
+            "Hello",
+            "The quick brown fox jumps over the lazy dog while the children watch "
+            "from the garden and laugh at the tired old dog.",
+        ]
+        
+        for pair in lang_pairs:
+            source_lang, target_lang = pair.split('-')
+            try:
+                print(f"Warming up model for {pair}")
+                for text in warmup_texts:
+                    # Bypass the translation cache so generation actually runs
+                    self._generate(pair, source_lang, target_lang, [text])
+                if self.device == "cuda":
+                    # Make sure queued kernels (and autotuning) finish before serving
+                    torch.cuda.synchronize()
+            except Exception as e:
+                print(f"Failed to warm up {pair}: {str(e)}")
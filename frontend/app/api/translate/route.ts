@@ -33,8 +33,12 @@ export async function POST(request: NextRequest) {
 
     if (!response.ok) {
       const errorData = await response.json();
+      // FastAPI validation errors (422) carry detail as a list of error objects
+      const detail = Array.isArray(errorData.detail)
+        ? errorData.detail.map((item: any) => item.msg).join('; ')
+        : errorData.detail;
       return NextResponse.json(
-        { error: errorData.detail || 'Translation failed' },
+        { error: detail || 'Translation failed' },
         { status: response.status }
       );
     }